@@ -0,0 +1 @@
+# Lets pytest import the top-level modules (parse.py, fetch.py, ...) from tests/.
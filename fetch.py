@@ -1,15 +1,61 @@
+from email.message import Message
+from pathlib import Path
+
 import requests
 from requests import HTTPError
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# One session per process so repeated fetches reuse the pooled TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',  # No 'br': requests can only decode brotli when the optional brotli package is installed
+})
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # raise_on_status=False hands the last bad response back so raise_for_status() still reports it as an HTTPError
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False),
+)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
 
-def fetch_html(url: str, timeout: int = 10) -> str:
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+def fetch_html(url: str, timeout: int = 10, cache_path: Path | None = None) -> tuple[bytes, str | None]:
+    """
+    Downloads the HTML at url.
+    Args:
+        url: The page to fetch.
+        timeout: Request timeout in seconds.
+        cache_path: Optional file holding the last downloaded copy. Its ETag / Last-Modified
+            validators are kept in sibling .etag / .lastmod files and sent as a conditional GET,
+            so an unchanged page costs a 304 round-trip instead of a full download. The header
+            charset is kept in a sibling .charset file so a 304 decodes the same way.
+    Returns:
+        The raw page bytes, undecoded, and the charset from the Content-Type header (None if it
+        declared none). Pass both to parse_valuations; without a header charset lxml reads the
+        page's <meta> tag itself.
+    """
+    headers = {}
+    if cache_path is not None and cache_path.exists():
+        etag_path = cache_path.with_suffix('.etag')
+        lastmod_path = cache_path.with_suffix('.lastmod')
+        if etag_path.exists():
+            headers['If-None-Match'] = etag_path.read_text(encoding='utf-8')
+        if lastmod_path.exists():
+            headers['If-Modified-Since'] = lastmod_path.read_text(encoding='utf-8')
     try:
         # This is the core network call that retrieves the HTML from the URL
-        r = requests.get(url, timeout=timeout, headers=headers)
+        r = _SESSION.get(url, timeout=timeout, headers=headers)
+        if cache_path is not None and r.status_code == 304: # Not Modified: the cached copy is still current
+            charset_path = cache_path.with_suffix('.charset')
+            charset = charset_path.read_text(encoding='utf-8') if charset_path.exists() else None
+            return cache_path.read_bytes(), charset
         r.raise_for_status()  # Raises an HTTPError for bad responses (4XX or 5XX)
-        return r.text
+        charset = _header_charset(r)
+        if cache_path is not None:
+            _write_cache(cache_path, r, charset)
+        return r.content, charset
     except HTTPError as http_err:
         # In a real app, you might want to log this or raise a custom exception
         print(f"HTTP error occurred: {http_err}") 
@@ -18,3 +64,35 @@ def fetch_html(url: str, timeout: int = 10) -> str:
         # In a real app, you might want to log this or raise a custom exception
         print(f"Other error occurred: {err}")
         raise
+
+def _header_charset(r: requests.Response) -> str | None:
+    # Only an explicit charset= counts; r.encoding would also report requests' ISO-8859-1 default for text/*
+    content_type = r.headers.get('Content-Type')
+    if not content_type:
+        return None
+    message = Message()
+    message['Content-Type'] = content_type
+    return message.get_content_charset()
+
+_VALIDATORS = (('.etag', 'ETag'), ('.lastmod', 'Last-Modified'))
+
+def _write_cache(cache_path: Path, r: requests.Response, charset: str | None) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Drop the old validators first: if we crash before the new ones land, the next run does a
+    # plain GET instead of getting a 304 that would bless a snapshot we never finished updating.
+    for suffix, _ in _VALIDATORS:
+        cache_path.with_suffix(suffix).unlink(missing_ok=True)
+    cache_path.with_suffix('.charset').unlink(missing_ok=True)
+    _write_atomic(cache_path, r.content)
+    if charset:
+        _write_atomic(cache_path.with_suffix('.charset'), charset.encode('utf-8'))
+    for suffix, header in _VALIDATORS:
+        value = r.headers.get(header)
+        if value:
+            _write_atomic(cache_path.with_suffix(suffix), value.encode('utf-8'))
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Write a sibling temp file and swap it in, so readers never see a half-written file
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
@@ -1,50 +1,138 @@
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
+import threading
 
-# Helper function to parse monetary values like $1.2B or $345M into billions
-def parse_monetary_value_to_billions(value_str_raw: str) -> float | None:
-    if not value_str_raw or value_str_raw.strip().upper() in ['N/A', '-', '']:
-        return None
-    match = re.search(r'\$([\d.]+)([BM])', value_str_raw, re.IGNORECASE)
-    if match:
-        val_num_str, unit = match.groups()
-        try:
-            valuation = float(val_num_str)
-            if unit.upper() == 'M':
-                valuation /= 1000.0  # Convert millions to billions
-            return valuation
-        except ValueError:
-            # print(f"Could not convert monetary value '{val_num_str}' to float.") # Optional debug
-            return None
-    else: # Attempt to parse if it's just a number, assuming billions
-        try:
-            cleaned_val_str = re.sub(r'[^\d.]', '', value_str_raw)
-            if cleaned_val_str:
-                 return float(cleaned_val_str)
-        except ValueError:
-            pass
-    return None
-
-# Helper function to parse percentage values like 19% or 0%
-def parse_percentage_value(value_str_raw: str) -> float | None:
-    if not value_str_raw or value_str_raw.strip().upper() in ['N/A', '-', '']:
-        return None
-    match = re.search(r'([\d.]+)%', value_str_raw)
-    if match:
-        try:
-            return float(match.group(1))
-        except ValueError:
-            # print(f"Could not convert percentage value '{match.group(1)}' to float.") # Optional debug
-            return None
-    else: # Attempt to parse if it's just a number (e.g. "0" meaning 0%)
+_MONEY_RE = re.compile(r'\$([\d.]+)([BM])', re.IGNORECASE)
+_PCT_RE = re.compile(r'([\d.]+)%')
+_NONDIGIT_RE = re.compile(r'[^\d.]')
+_RANK_RE = re.compile(r'\d+')
+
+# Parses monetary cells like $1.2B or $345M into billions (NaN if unparseable), one vectorized regex sweep per column
+def _parse_monetary_column(raw_values: list[str]) -> np.ndarray:
+    raw = pd.Series(raw_values, dtype=object)  # N/A, '-' and '' fall through both paths to NaN
+    extracted = raw.str.extract(_MONEY_RE)
+    amounts = pd.to_numeric(extracted[0], errors='coerce').to_numpy(dtype=np.float64)
+    in_millions = extracted[1].str.upper().eq('M').to_numpy()
+    # Cells without a $<num><B|M> token are read as a bare number, assuming billions
+    bare_numbers = pd.to_numeric(raw.str.replace(_NONDIGIT_RE, '', regex=True), errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(
+        extracted[0].notna().to_numpy(),
+        np.where(in_millions, amounts / 1000.0, amounts),
+        bare_numbers,
+    )
+
+# Parses percentage cells like 19% or 0% (NaN if unparseable), one vectorized regex sweep per column
+def _parse_percentage_column(raw_values: list[str]) -> np.ndarray:
+    raw = pd.Series(raw_values, dtype=object)
+    extracted = pd.to_numeric(raw.str.extract(_PCT_RE, expand=False), errors='coerce').to_numpy(dtype=np.float64)
+    # Cells without a % sign are read as a bare number (e.g. "0" meaning 0%)
+    bare_numbers = pd.to_numeric(raw.str.strip(), errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isnan(extracted), bare_numbers, extracted)
+
+# CNBC renders the valuations table with a generated class like "TheTable-table-GqgO2hLS"
+_TABLE_CLASS_PREFIX = 'TheTable-table'
+
+# lxml parser target that streams the valuations <table> and keeps only its cell text.
+# Callbacks fire as libxml2 tokenizes the page, so no DOM is built for the rest of the article.
+# The first table whose class starts with _TABLE_CLASS_PREFIX wins; the page's first table is the fallback.
+class _TableTarget:
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._anchored_rows = None  # Rows of the class-anchored table, once one is seen
+        self._first_rows = None     # Rows of the page's first table (fallback)
+        self._current = None        # Row list of the table being read, if any
+        self._nested_tables = 0
+        self.finished = False       # True once the class-anchored table has closed; later input is irrelevant
+        self._row = None
+        self._cell = None
+
+    def start(self, tag, attrib):
+        if tag == 'table':
+            if self._current is not None:
+                self._nested_tables += 1
+            elif self._anchored_rows is None:
+                if any(c.startswith(_TABLE_CLASS_PREFIX) for c in attrib.get('class', '').split()):
+                    self._current = self._anchored_rows = []
+                elif self._first_rows is None:
+                    self._current = self._first_rows = []
+        elif self._current is None or self._nested_tables:
+            return
+        elif tag == 'tr':
+            self._row = []
+        elif tag == 'td' and self._row is not None:
+            self._cell = []
+
+    def end(self, tag):
+        if self._current is None:
+            return
+        if tag == 'table':
+            if self._nested_tables:
+                self._nested_tables -= 1
+            else:
+                self.finished = self._current is self._anchored_rows
+                self._current = None
+        elif self._nested_tables: # Nested table text just flows into the enclosing cell
+            return
+        elif tag == 'td' and self._cell is not None:
+            self._row.append(''.join(self._cell).strip())  # One list of stripped <td> strings per <tr>
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._current.append(self._row)
+            self._row = None
+
+    def data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def close(self):
+        # None signals that the page had no <table> at all
+        rows = self._anchored_rows if self._anchored_rows is not None else self._first_rows
+        self._reset()  # The owning parser is reused for the next document
+        return rows
+
+def _new_parser(encoding: str | None) -> etree.HTMLParser:
+    # Blank text, comments and PIs never reach the target, and no id index is needed without a tree
+    return etree.HTMLParser(
+        target=_TableTarget(), encoding=encoding,
+        remove_blank_text=True, remove_comments=True, remove_pis=True, collect_ids=False,
+    )
+
+# lxml parsers must not be shared between threads, and parse_valuations may be called from several,
+# so each thread builds its parsers once (one per encoding) and reuses them for every later call.
+# The None entry lets lxml take the charset from the page's <meta>.
+_PARSER_LOCAL = threading.local()
+
+def _table_parser(encoding: str | None) -> etree.HTMLParser:
+    parsers = getattr(_PARSER_LOCAL, 'parsers', None)
+    if parsers is None:
+        parsers = _PARSER_LOCAL.parsers = {}
+    key = encoding.lower() if encoding else None
+    parser = parsers.get(key)
+    if parser is None:
         try:
-            stripped_val = value_str_raw.strip()
-            if stripped_val:
-                return float(stripped_val)
-        except ValueError:
-            pass
-    return None
+            parser = parsers[key] = _new_parser(key)
+        except LookupError: # Charset Python doesn't know: fall back to the page's own declaration
+            parser = _table_parser(None)
+    return parser
+
+_FEED_CHUNK_SIZE = 64 * 1024
+
+def _read_table_rows(html: str | bytes, encoding: str | None = None) -> list[list[str]] | None:
+    # Push the page through the parser in chunks and stop as soon as the valuations table has closed,
+    # so the footer, related-content blocks and scripts after it are never tokenized.
+    parser = _table_parser(encoding if isinstance(html, bytes) else None) # str input is already decoded
+    try:
+        for offset in range(0, len(html), _FEED_CHUNK_SIZE):
+            parser.feed(html[offset:offset + _FEED_CHUNK_SIZE])
+            if parser.target.finished:
+                break
+    finally:
+        rows = parser.close()  # Always close, so the per-thread parser starts the next page clean
+    return rows
 
 EXPECTED_COLUMNS = [
     'rank', 'team', 'country', 'league',
@@ -52,90 +140,96 @@ EXPECTED_COLUMNS = [
     'debt_pct_value', 'owners'
 ]
 
-def parse_valuations(html: str) -> pd.DataFrame | None:
+def parse_valuations(html: str | bytes, max_rows: int | None = None, encoding: str | None = None) -> pd.DataFrame | None:
     """
     Parses the HTML content to extract the soccer team valuations table.
+    Safe to call from several threads at once: each thread reuses its own lxml parsers.
     Args:
-        html: The HTML content as a string.
+        html: The HTML content, preferably as raw bytes so lxml decodes it once using the page's declared charset.
+        max_rows: Stop after this many rows have been accepted (in table order), skipping any trailing rows.
+            None reads the whole table; otherwise it must be at least 1.
+        encoding: The charset from the HTTP Content-Type header, if it declared one. It overrides the page's
+            <meta> charset when decoding bytes, as a browser would; None leaves detection to lxml.
     Returns:
         A pandas DataFrame with columns defined in EXPECTED_COLUMNS, or None if parsing fails.
+    Raises:
+        ValueError: If max_rows is less than 1.
     """
-    soup = BeautifulSoup(html, 'lxml')
-    data_rows = []
-    valuation_table = soup.find('table')
+    if max_rows is not None and max_rows < 1:
+        raise ValueError(f"max_rows must be at least 1 or None, got {max_rows}")
+    # Column-wise accumulators (one list per output column); numeric cells stay raw
+    # until after the loop so each column is parsed in a single vectorized pass
+    ranks, teams, countries, leagues, owners_list = [], [], [], [], []
+    value_raws, revenue_raws, ebitda_raws, debt_pct_raws = [], [], [], []
+    seen_ranks: set[int] = set()     # Duplicate rows are dropped here, first occurrence wins
+    seen_teams_lc: set[str] = set()
+    rows = _read_table_rows(html, encoding) if html else None
 
-    if not valuation_table:
+    if rows is None:
         print("No HTML table found on the page. Cannot parse valuations.")
         return None
 
-    # print("Found an HTML table. Attempting to parse rows from it.") # Optional debug
-    tbody = valuation_table.find('tbody')
-    if not tbody:
-        tbody = valuation_table
-
-    rows = tbody.find_all('tr')
     # print(f"Found {len(rows)} rows in the table.") # Optional debug
 
-    for i, row in enumerate(rows):
-        cells = row.find_all('td')
-        if len(cells) >= 9: # Ensure enough cells for all 9 columns
-            try:
-                rank_str = cells[0].get_text(strip=True)
-                team_str = cells[1].get_text(strip=True)
-                country_str = cells[2].get_text(strip=True)
-                league_str = cells[3].get_text(strip=True)
-                value_raw = cells[4].get_text(strip=True)
-                revenue_raw = cells[5].get_text(strip=True)
-                ebitda_raw = cells[6].get_text(strip=True)
-                debt_pct_raw = cells[7].get_text(strip=True)
-                owners_str = cells[8].get_text(strip=True)
-
-                rank = int(re.sub(r'[^\d]', '', rank_str))
-                team = team_str
-                country = country_str
-                league = league_str
-                owners = owners_str
-
-                value_usd_bln = parse_monetary_value_to_billions(value_raw)
-                revenue_usd_bln = parse_monetary_value_to_billions(revenue_raw)
-                ebitda_usd_bln = parse_monetary_value_to_billions(ebitda_raw)
-                debt_pct_value = parse_percentage_value(debt_pct_raw)
-
-                if team:
-                    is_duplicate = any(r_data[0] == rank or r_data[1].lower() == team.lower() for r_data in data_rows)
-                    if not is_duplicate:
-                        data_rows.append((
-                            rank, team, country, league,
-                            value_usd_bln, revenue_usd_bln, ebitda_usd_bln,
-                            debt_pct_value, owners
-                        ))
-            except ValueError: # Catches rank int conversion failure (e.g., header)
-                if i > 0: # Only print warning for non-header rows failing rank conversion
-                    # print(f"Skipping data row due to ValueError (likely rank '{cells[0].get_text(strip=True)}')") # Optional debug
-                    pass
-            except Exception as e:
-                # print(f"Skipping row due to unexpected error: {e}") # Optional debug
-                pass
-        elif i > 0 : # If not enough cells and not the header row
-            # print(f"Skipping data row {i+1}, not enough cells: {len(cells)}") # Optional debug
-            pass
-
-    if not data_rows:
+    for i, cells in enumerate(rows):
+        if len(cells) < 9: # Header row (<th> cells are not collected) or a layout row without all 9 columns
+            # print(f"Skipping row {i+1}, not enough cells: {len(cells)}") # Optional debug
+            continue
+
+        (rank_str, team, country, league,
+         value_raw, revenue_raw, ebitda_raw, debt_pct_raw, owners) = cells[:9]
+
+        rank_match = _RANK_RE.search(rank_str)
+        if not rank_match: # Header row written with <td> labels, or another row without a rank number
+            # print(f"Skipping row {i+1}, no rank in '{rank_str}'") # Optional debug
+            continue
+        rank = int(rank_match.group())
+
+        team_lc = team.lower()
+        if not team or rank in seen_ranks or team_lc in seen_teams_lc:
+            continue
+        seen_ranks.add(rank)
+        seen_teams_lc.add(team_lc)
+        ranks.append(rank)
+        teams.append(team)
+        countries.append(country)
+        leagues.append(league)
+        value_raws.append(value_raw)
+        revenue_raws.append(revenue_raw)
+        ebitda_raws.append(ebitda_raw)
+        debt_pct_raws.append(debt_pct_raw)
+        owners_list.append(owners)
+        if max_rows is not None and len(ranks) >= max_rows:
+            break
+
+    if not ranks:
         # print("No data rows extracted from the HTML table.") # Optional debug
         return None
 
-    df = pd.DataFrame(data_rows, columns=EXPECTED_COLUMNS)
-    df['rank'] = df['rank'].astype(int)
-    numeric_cols = ['value_usd_bln', 'revenue_usd_bln', 'ebitda_usd_bln', 'debt_pct_value']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    string_cols = ['team', 'country', 'league', 'owners']
-    for col in string_cols:
-        df[col] = df[col].astype(str).replace('None', '')
-
-    df.sort_values(by='rank', inplace=True)
-    df.drop_duplicates(subset=['rank'], keep='first', inplace=True)
-    df.drop_duplicates(subset=['team'], keep='first', inplace=True)
+    # Put rows in rank order on the plain lists, before any DataFrame block exists.
+    # The table is normally already ranked, so the O(n) check usually skips the permutation.
+    rank_array = np.asarray(ranks, dtype=np.int64)
+    if not np.all(rank_array[1:] >= rank_array[:-1]):
+        order = np.argsort(rank_array, kind='stable')
+        rank_array = rank_array[order]
+        teams, countries, leagues, owners_list, value_raws, revenue_raws, ebitda_raws, debt_pct_raws = (
+            [column[i] for i in order]
+            for column in (teams, countries, leagues, owners_list, value_raws, revenue_raws, ebitda_raws, debt_pct_raws)
+        )
+
+    # Columns are built already typed (unparseable numbers become NaN in the float64
+    # arrays), so no post-hoc coercion passes are needed. The dict is keyed in
+    # EXPECTED_COLUMNS order and copy=False lets pandas adopt the arrays as-is.
+    df = pd.DataFrame({
+        'rank': rank_array,
+        'team': teams,
+        'country': countries,
+        'league': leagues,
+        'value_usd_bln': _parse_monetary_column(value_raws),
+        'revenue_usd_bln': _parse_monetary_column(revenue_raws),
+        'ebitda_usd_bln': _parse_monetary_column(ebitda_raws),
+        'debt_pct_value': _parse_percentage_column(debt_pct_raws),
+        'owners': owners_list,
+    }, copy=False)
     # print("Successfully parsed data into DataFrame.") # Optional debug
     return df 
\ No newline at end of file
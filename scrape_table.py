@@ -1,6 +1,10 @@
 from pathlib import Path
+import argparse
+import hashlib
+import inspect
+import numpy as np
 import pandas as pd
-import os # Import os module for clearing screen
+import sys
 
 # Removed project_root, scraper_module_path, and sys.path.insert lines
 # as fetch.py is now expected to be in the same directory or Python path.
@@ -11,89 +15,118 @@ try:
 except ImportError as e:
     print(f"Error: Could not import necessary functions. {e}")
     print("Ensure fetch.py and parse.py are in the same directory or accessible in PYTHONPATH.")
-    import sys 
     print(f"Current sys.path: {sys.path}")
     sys.exit(1)
 
 CNBC_URL = "https://www.cnbc.com/2025/05/05/cnbcs-official-global-soccer-team-valuations-2025.html"
+EXPECTED_TEAM_COUNT = 25 # The article ranks exactly 25 clubs; anything after that in the table is not data
 OUTPUT_CSV_FILENAME = "Scraped.csv"
 PROJECT_ROOT = Path(__file__).resolve().parent
 OUTPUT_CSV_PATH = PROJECT_ROOT / OUTPUT_CSV_FILENAME
+SNAPSHOT_PATH = PROJECT_ROOT / ".cache" / "cnbc_valuations.html" # Last downloaded page, revalidated with a conditional GET
+PARSE_CACHE_DIR = PROJECT_ROOT / ".cache" # Pickled parse results, keyed by page + parser source hash
 
 # Imports for Rich table display
 from rich.console import Console
 from rich.table import Table
 
-def process_valuations():
-    os.system('cls') # Clear the terminal screen on Windows
+# Define column styles for better readability (optional)
+# Example: Right-align numeric columns, left-align text
+COLUMN_STYLES = {
+    'rank': {"justify": "left", "style": "dim"},
+    'team': {"justify": "left"},
+    'country': {"justify": "left"},
+    'league': {"justify": "left"},
+    'value_usd_bln': {"justify": "left"},
+    'revenue_usd_bln': {"justify": "left"},
+    'ebitda_usd_bln': {"justify": "left"},
+    'debt_pct_value': {"justify": "left"},
+    'owners': {"justify": "left", "overflow": "fold"} # Fold long text
+}
+FLOAT_FORMAT_COLS = {
+    'value_usd_bln': '{:.3f}',
+    'revenue_usd_bln': '{:.3f}',
+    'ebitda_usd_bln': '{:.3f}',
+    'debt_pct_value': '{:.1f}%'
+}
+NA_MARKUP = "[dim cyan]N/A[/dim cyan]" # Using Rich markup for N/A
+
+def parse_valuations_cached(html_content: bytes, encoding: str | None = None) -> pd.DataFrame | None:
+    """
+    Returns parse_valuations(html_content, encoding=encoding), reusing a pickled result when the same page was
+    already parsed by the same version of parse.py. Only the latest result is kept on disk.
+    """
+    digest = hashlib.blake2b(html_content, digest_size=16)
+    digest.update(Path(inspect.getsourcefile(parse_valuations)).read_bytes()) # Parser edits invalidate the cache
+    digest.update(str(EXPECTED_TEAM_COUNT).encode('ascii'))
+    digest.update(f"|{encoding}".encode('utf-8')) # Same bytes decode differently under another header charset
+    digest.update(f"|pandas {pd.__version__}|numpy {np.__version__}".encode('ascii')) # Pickles aren't portable across versions
+    cache_path = PARSE_CACHE_DIR / f"parsed_{digest.hexdigest()}.pkl"
+    if cache_path.exists():
+        try:
+            return pd.read_pickle(cache_path)
+        except Exception as e: # Truncated or otherwise unreadable pickle: drop it and parse again
+            print(f"Ignoring unreadable parse cache {cache_path.name}: {e}")
+            cache_path.unlink(missing_ok=True)
+
+    df = parse_valuations(html_content, max_rows=EXPECTED_TEAM_COUNT, encoding=encoding)
+    if df is not None:
+        PARSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for stale_path in PARSE_CACHE_DIR.glob("parsed_*.pkl"):
+            stale_path.unlink()
+        df.to_pickle(cache_path)
+    return df
+
+def process_valuations(export_html: bool = False):
+    if sys.stdout.isatty(): # Keep redirected output free of screen-clearing escapes
+        Console().clear() # No shell subprocess; Rich uses the console API on legacy Windows
     print(f"Attempting to download and parse valuations from: {CNBC_URL}")
     try:
-        html_content = fetch_html(CNBC_URL)
+        html_content, encoding = fetch_html(CNBC_URL, cache_path=SNAPSHOT_PATH)
         if html_content:
             print("HTML content fetched successfully. Attempting to parse...")
-            df_valuations = parse_valuations(html_content)
+            df_valuations = parse_valuations_cached(html_content, encoding)
             
             if df_valuations is not None and not df_valuations.empty:
-                df_valuations.to_csv(OUTPUT_CSV_PATH, index=False, encoding='utf-8')
+                # Binary handle + explicit '\n' skips text-mode newline translation; '%.6g' skips repr-style float formatting
+                with open(OUTPUT_CSV_PATH, 'wb') as csv_file:
+                    df_valuations.to_csv(csv_file, index=False, encoding='utf-8', lineterminator='\n', float_format='%.6g')
                 print(f"Successfully parsed and saved valuations to: {OUTPUT_CSV_PATH}")
                 print(f"DataFrame shape: {df_valuations.shape}")
 
                 # Display the DataFrame as a Rich table
-                console = Console(record=True) # Enable recording for HTML export
+                console = Console(record=export_html) # Recording (needed only for HTML export) buffers every rendered segment
                 rich_table = Table(title="Soccer Club Valuations", show_header=True, header_style="bold magenta", show_lines=True)
 
-                # Define column styles for better readability (optional)
-                # Example: Right-align numeric columns, left-align text
-                column_styles = {
-                    'rank': {"justify": "left", "style": "dim"},
-                    'team': {"justify": "left"},
-                    'country': {"justify": "left"},
-                    'league': {"justify": "left"},
-                    'value_usd_bln': {"justify": "left"},
-                    'revenue_usd_bln': {"justify": "left"},
-                    'ebitda_usd_bln': {"justify": "left"},
-                    'debt_pct_value': {"justify": "left"},
-                    'owners': {"justify": "left", "overflow": "fold"} # Fold long text
-                }
-                float_format_cols = {
-                    'value_usd_bln': '{:.3f}',
-                    'revenue_usd_bln': '{:.3f}',
-                    'ebitda_usd_bln': '{:.3f}',
-                    'debt_pct_value': '{:.1f}%'
-                }
-
+                # Build the render plan once per column: header + style, then the whole column
+                # formatted with a pre-bound formatter and a vectorized missing-value mask
+                formatted_columns = []
                 for col_name in df_valuations.columns:
-                    style_args = column_styles.get(col_name, {})
+                    style_args = COLUMN_STYLES.get(col_name, {})
                     rich_table.add_column(str(col_name).replace('_', ' ').title(), **style_args)
 
-                for index, row in df_valuations.iterrows():
-                    row_values_for_rich = []
-                    for col_name in df_valuations.columns:
-                        value = row[col_name]
-                        if pd.isna(value):
-                            row_values_for_rich.append("[dim cyan]N/A[/dim cyan]") # Using Rich markup for N/A
-                        elif col_name in float_format_cols:
-                            # Ensure value is float before formatting, handle potential strings if parsing was loose
-                            try:
-                                formatted_value = float_format_cols[col_name].format(float(value))
-                                row_values_for_rich.append(formatted_value)
-                            except ValueError:
-                                row_values_for_rich.append(str(value)) # Fallback to string if not convertible
-                        else:
-                            row_values_for_rich.append(str(value))
+                    format_value = FLOAT_FORMAT_COLS[col_name].format if col_name in FLOAT_FORMAT_COLS else str
+                    column = df_valuations[col_name]
+                    formatted_columns.append([
+                        NA_MARKUP if is_missing else format_value(value)
+                        for value, is_missing in zip(column.tolist(), column.isna().tolist())
+                    ])
+
+                for row_values_for_rich in zip(*formatted_columns):
                     rich_table.add_row(*row_values_for_rich)
                 
                 console.print("\nGlobal Teams 🌐:")
                 console.print(rich_table)
 
                 # Export the Rich table to an HTML file
-                try:
-                    html_output_filename = "rich_table_output.html"
-                    html_output_path = PROJECT_ROOT / html_output_filename
-                    console.save_html(str(html_output_path))
-                    print(f"Rich table also saved to: {html_output_path}")
-                except Exception as e_html:
-                    print(f"Error saving Rich table as HTML: {e_html}")
+                if export_html:
+                    try:
+                        html_output_filename = "rich_table_output.html"
+                        html_output_path = PROJECT_ROOT / html_output_filename
+                        console.save_html(str(html_output_path))
+                        print(f"Rich table also saved to: {html_output_path}")
+                    except Exception as e_html:
+                        print(f"Error saving Rich table as HTML: {e_html}")
 
             elif df_valuations is None:
                 print("Parsing returned None. Could not create DataFrame.")
@@ -105,4 +138,7 @@ def process_valuations():
         print(f"An error occurred during the process: {e}")
 
 if __name__ == "__main__":
-    process_valuations() 
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Scrape CNBC's global soccer team valuations table.")
+    arg_parser.add_argument("--html", action="store_true", help="Also export the Rich table to rich_table_output.html")
+    args = arg_parser.parse_args()
+    process_valuations(export_html=args.html) 
\ No newline at end of file
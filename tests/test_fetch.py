@@ -0,0 +1,54 @@
+import responses
+
+import fetch
+
+URL = 'https://example.com/valuations.html'
+
+
+@responses.activate
+def test_conditional_get_serves_cached_snapshot_on_304(tmp_path):
+    cache_path = tmp_path / 'snapshot.html'
+    responses.get(URL, body=b'<table>v1</table>', headers={'ETag': '"v1"'})
+    assert fetch.fetch_html(URL, cache_path=cache_path) == (b'<table>v1</table>', None)
+    assert cache_path.with_suffix('.etag').read_text(encoding='utf-8') == '"v1"'
+
+    responses.get(URL, status=304)
+    assert fetch.fetch_html(URL, cache_path=cache_path) == (b'<table>v1</table>', None)
+    assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+@responses.activate
+def test_new_response_replaces_snapshot_and_stale_validators(tmp_path):
+    cache_path = tmp_path / 'snapshot.html'
+    responses.get(URL, body=b'v1', headers={'ETag': '"v1"'})
+    fetch.fetch_html(URL, cache_path=cache_path)
+
+    responses.replace(responses.GET, URL, body=b'v2', headers={'Last-Modified': 'Wed, 14 Oct 2026 10:00:00 GMT'})
+    assert fetch.fetch_html(URL, cache_path=cache_path) == (b'v2', None)
+    assert cache_path.read_bytes() == b'v2'
+    assert not cache_path.with_suffix('.etag').exists()
+    assert cache_path.with_suffix('.lastmod').exists()
+
+
+@responses.activate
+def test_header_charset_is_returned_and_kept_for_304(tmp_path):
+    cache_path = tmp_path / 'snapshot.html'
+    body = '<p>Atlético</p>'.encode('utf-8')
+    responses.get(URL, body=body, content_type='text/html; charset=UTF-8', headers={'ETag': '"v1"'})
+    assert fetch.fetch_html(URL, cache_path=cache_path) == (body, 'utf-8')
+
+    responses.replace(responses.GET, URL, status=304)
+    assert fetch.fetch_html(URL, cache_path=cache_path) == (body, 'utf-8')
+
+
+@responses.activate
+def test_content_type_without_charset_is_not_guessed():
+    responses.get(URL, body=b'<p>x</p>', content_type='text/html')
+    assert fetch.fetch_html(URL) == (b'<p>x</p>', None)
+
+
+@responses.activate
+def test_304_without_cache_returns_empty_body():
+    responses.get(URL, status=304)
+    assert fetch.fetch_html(URL) == (b'', None)
@@ -0,0 +1,170 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import parse
+
+HEADER = ['Rank', 'Team', 'Country', 'League', 'Value', 'Revenue', 'EBITDA', 'Debt', 'Owners']
+REAL_MADRID = ['1.', 'Real Madrid', 'Spain', 'La Liga', '$6.7B', '$1.13B', '$125M', '19%', 'Club members']
+MAN_UTD = ['2.', 'Manchester United', 'England', 'Premier League', '$6B', '$834M', '$186M', '11%', 'The Glazer family']
+BARCELONA = ['3.', 'Barcelona', 'Spain', 'La Liga', '$5.65B', '$822M', 'N/A', '0', 'Club members']
+ATLETICO = ['13.', 'Atlético de Madrid', 'Spain', 'La Liga', '$2.4B', '$465M', '$77M', '30%', 'Ares Management']
+
+
+def _row(cells, tag='td'):
+    return '<tr>' + ''.join(f'<{tag}>{c}</{tag}>' for c in cells) + '</tr>'
+
+
+def _table(*rows, css_class=None):
+    class_attr = f' class="{css_class}"' if css_class else ''
+    return f'<table{class_attr}><thead>{_row(HEADER, "th")}</thead><tbody>{"".join(_row(r) for r in rows)}</tbody></table>'
+
+
+def _page(*body_parts):
+    return '<html><head><meta charset="utf-8"></head><body>' + ''.join(body_parts) + '</body></html>'
+
+
+def test_parses_rows_into_typed_columns():
+    page = _page(_table(REAL_MADRID, MAN_UTD, BARCELONA, css_class='TheTable-table-GqgO2hLS'))
+
+    df = parse.parse_valuations(page.encode('utf-8'))
+
+    assert list(df.columns) == parse.EXPECTED_COLUMNS
+    assert df['rank'].tolist() == [1, 2, 3]
+    assert df['team'].tolist() == ['Real Madrid', 'Manchester United', 'Barcelona']
+    assert df['value_usd_bln'].tolist() == [6.7, 6.0, 5.65]
+    assert df['ebitda_usd_bln'].tolist()[:2] == [0.125, 0.186]
+    assert np.isnan(df['ebitda_usd_bln'].iloc[2])
+    assert df['debt_pct_value'].tolist() == [19.0, 11.0, 0.0]
+    assert df['rank'].dtype == np.int64
+    assert df['value_usd_bln'].dtype == np.float64
+
+
+def test_skips_header_rows_drops_duplicates_and_sorts_by_rank():
+    td_header = _row(HEADER)
+    page = _page(f'<table>{td_header}{_row(BARCELONA)}{_row(REAL_MADRID)}{_row(BARCELONA)}{_row(MAN_UTD)}</table>')
+
+    df = parse.parse_valuations(page)
+
+    assert df['team'].tolist() == ['Real Madrid', 'Manchester United', 'Barcelona']
+    assert df.index.tolist() == [0, 1, 2]
+
+
+def test_prefers_class_anchored_table_over_earlier_tables():
+    decoy = ['9', 'Decoy FC', 'Nowhere', 'None', '$1B', '$1B', '$1B', '1%', 'Nobody']
+    page = _page(_table(decoy), _table(REAL_MADRID, MAN_UTD, css_class='promo TheTable-table-abc'))
+
+    df = parse.parse_valuations(page)
+
+    assert df['team'].tolist() == ['Real Madrid', 'Manchester United']
+
+
+def test_falls_back_to_first_table_without_anchor_class():
+    decoy = ['9', 'Decoy FC', 'Nowhere', 'None', '$1B', '$1B', '$1B', '1%', 'Nobody']
+    page = _page(_table(REAL_MADRID), _table(decoy))
+
+    df = parse.parse_valuations(page)
+
+    assert df['team'].tolist() == ['Real Madrid']
+
+
+def test_nested_table_text_folds_into_enclosing_cell():
+    owners_cell = 'Club <table><tr><td>members</td></tr></table>'
+    page = _page(_table(REAL_MADRID[:8] + [owners_cell], MAN_UTD))
+
+    df = parse.parse_valuations(page)
+
+    assert df['team'].tolist() == ['Real Madrid', 'Manchester United']
+    assert df['owners'].tolist() == ['Club members', 'The Glazer family']
+
+
+@pytest.mark.parametrize('html', ['', b'', '   ', _page('<p>No tables here</p>')])
+def test_returns_none_without_a_table(html):
+    assert parse.parse_valuations(html) is None
+
+
+def test_returns_none_when_table_has_no_data_rows():
+    assert parse.parse_valuations(_page(_table())) is None
+
+
+def test_reused_parser_starts_each_page_clean():
+    anchored = _page(_table(MAN_UTD, css_class='TheTable-table-x'))
+    plain = _page(_table(REAL_MADRID))
+
+    assert parse.parse_valuations(anchored)['team'].tolist() == ['Manchester United']
+    assert parse.parse_valuations(_page('<p>none</p>')) is None
+    assert parse.parse_valuations(plain)['team'].tolist() == ['Real Madrid']
+    assert parse.parse_valuations(plain.encode('utf-8'))['team'].tolist() == ['Real Madrid']
+
+
+
+def test_concurrent_parses_do_not_share_parser_state():
+    big_page = _page(_table(REAL_MADRID, MAN_UTD, BARCELONA, css_class='TheTable-table-x'), '<p>trailing</p>' * 2_000)
+    pages = [
+        (big_page.encode('utf-8'), None, ['Real Madrid', 'Manchester United', 'Barcelona']),
+        (_page(_table(MAN_UTD)), None, ['Manchester United']),
+        (('<html><body>' + _table(ATLETICO) + '</body></html>').encode('utf-8'), 'utf-8', ['Atlético de Madrid']),
+        (_page('<p>none</p>').encode('utf-8'), None, None),
+    ]
+
+    def parse_teams(i):
+        html, encoding, _ = pages[i % len(pages)]
+        df = parse.parse_valuations(html, encoding=encoding)
+        return None if df is None else df['team'].tolist()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(parse_teams, range(64)))
+
+    assert results == [pages[i % len(pages)][2] for i in range(64)]
+
+def test_max_rows_keeps_the_first_accepted_rows():
+    page = _page(_table(REAL_MADRID, REAL_MADRID, MAN_UTD, BARCELONA))
+
+    assert parse.parse_valuations(page, max_rows=1)['team'].tolist() == ['Real Madrid']
+    assert parse.parse_valuations(page, max_rows=2)['team'].tolist() == ['Real Madrid', 'Manchester United']
+
+
+@pytest.mark.parametrize('max_rows', [0, -1])
+def test_max_rows_below_one_is_rejected(max_rows):
+    with pytest.raises(ValueError):
+        parse.parse_valuations(_page(_table(REAL_MADRID)), max_rows=max_rows)
+
+
+def test_header_charset_decodes_page_without_meta_charset():
+    page = ('<html><body>' + _table(ATLETICO) + '</body></html>').encode('utf-8')
+
+    assert parse.parse_valuations(page, encoding='UTF-8')['team'].tolist() == ['Atlético de Madrid']
+
+
+def test_unknown_header_charset_falls_back_to_meta_charset():
+    page = _page(_table(ATLETICO)).encode('utf-8')
+
+    assert parse.parse_valuations(page, encoding='x-bogus')['team'].tolist() == ['Atlético de Madrid']
+
+
+class _CountingParser:
+    def __init__(self, parser):
+        self._parser = parser
+        self.target = parser.target
+        self.fed = 0
+
+    def feed(self, data):
+        self.fed += len(data)
+        self._parser.feed(data)
+
+    def close(self):
+        return self._parser.close()
+
+
+def test_stops_feeding_once_anchored_table_closes(monkeypatch):
+    page = _page(_table(REAL_MADRID, css_class='TheTable-table-x'), '<p>trailing</p>' * 10_000).encode('utf-8')
+    counting = _CountingParser(parse._table_parser(None))
+    monkeypatch.setitem(parse._PARSER_LOCAL.parsers, None, counting)
+    monkeypatch.setattr(parse, '_FEED_CHUNK_SIZE', 256)
+
+    df = parse.parse_valuations(page)
+
+    assert df['team'].tolist() == ['Real Madrid']
+    assert counting.fed < len(page) // 10
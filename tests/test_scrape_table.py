@@ -0,0 +1,32 @@
+import pandas as pd
+
+import scrape_table
+
+PAGE = (
+    '<table><tr><td>1.</td><td>Real Madrid</td><td>Spain</td><td>La Liga</td>'
+    '<td>$6.7B</td><td>$1.13B</td><td>$125M</td><td>19%</td><td>Club members</td></tr></table>'
+).encode('utf-8')
+
+
+def test_unreadable_parse_cache_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrape_table, 'PARSE_CACHE_DIR', tmp_path)
+    scrape_table.parse_valuations_cached(PAGE)
+    (cache_path,) = tmp_path.glob('parsed_*.pkl')
+    cache_path.write_bytes(b'not a pickle')
+
+    df = scrape_table.parse_valuations_cached(PAGE)
+
+    assert df['team'].tolist() == ['Real Madrid']
+    assert pd.read_pickle(cache_path).equals(df)
+
+
+def test_redirected_output_has_no_clear_screen_escapes(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(scrape_table, 'fetch_html', lambda url, cache_path=None: (PAGE, None))
+    monkeypatch.setattr(scrape_table, 'PARSE_CACHE_DIR', tmp_path)
+    monkeypatch.setattr(scrape_table, 'OUTPUT_CSV_PATH', tmp_path / 'Scraped.csv')
+
+    scrape_table.process_valuations()
+
+    out = capsys.readouterr().out
+    assert out.startswith('Attempting to download')
+    assert '\x1b' not in out